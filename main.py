@@ -1,11 +1,34 @@
 import sys
-import io
-# Fix encoding for Windows console
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
 
 import uvicorn
+
+# --- LOGGING ---
+# Records are pushed to a queue and written by a background thread, so
+# request handlers never block on stdout/stderr writes. The handler handles
+# non-UTF-8-safe consoles (Windows) itself, so no stdout re-wrap is needed.
+import logging
+import logging.handlers
+import os
+import queue
+
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+if hasattr(_log_handler.stream, 'reconfigure'):
+    _log_handler.stream.reconfigure(errors='replace')
+_log_handler.setFormatter(logging.Formatter("%(levelname)s:     %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+
+logger = logging.getLogger("cineverse")
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+# INFO by default; set CINEVERSE_LOG_LEVEL=WARNING in production to skip
+# per-request log formatting entirely (lazy %s args are never rendered
+# when the level is disabled).
+_log_level = logging.getLevelName(os.environ.get("CINEVERSE_LOG_LEVEL", "INFO").upper())
+logger.setLevel(_log_level if isinstance(_log_level, int) else logging.INFO)
+
 from fastapi import FastAPI, Request, Response, HTTPException
-from fastapi.responses import HTMLResponse, StreamingResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, RedirectResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import httpx
@@ -14,52 +37,93 @@ from moviebox_api import Homepage, MovieDetails, MovieAuto, Session, resolve_med
 from moviebox_api.download import DownloadableMovieFilesDetail, DownloadableTVSeriesFilesDetail
 from moviebox_api.models import SearchResultsItem
 from moviebox_api.constants import ITEM_DETAILS_PATH
+import orjson
 import os
 import asyncio
+from secrets import token_hex
 
 # --- CONFIGURATION ---
 # Patch the host to match the working website
 moviebox_api.constants.HOST_URL = "https://moviebox.ph/"
 
 # --- MONKEY PATCH: Fix Pydantic Validation Errors for 'referer' ---
-try:
-    import moviebox_api.extractor.models.json as json_models
-    from pydantic import HttpUrl
-    from typing import Union, Optional
-
-    # Relax referer fields to allow empty strings/invalid URLs
-    # Patch MetadataModel
-    json_models.MetadataModel.__annotations__['referer'] = Union[HttpUrl, str, None]
-    json_models.MetadataModel.model_rebuild(force=True)
-
-    # Patch PubParamModel 
-    json_models.PubParamModel.__annotations__['referer'] = Union[HttpUrl, str, None]
-    json_models.PubParamModel.model_rebuild(force=True)
-
-    # Patch ResDataModel
-    json_models.ResDataModel.__annotations__['referer'] = Union[HttpUrl, str, None]
-    json_models.ResDataModel.model_rebuild(force=True)
-    
-    # Patch ItemJsonDetailsModel to reflect changes
-    json_models.ItemJsonDetailsModel.model_rebuild(force=True)
-    
-    print("✅ Successfully patched Pydantic models for empty referer.")
-except Exception as e:
-    print(f"❌ Failed to patch models: {e}")
-    import traceback
-    traceback.print_exc()
+# model_rebuild(force=True) walks the field graph and regenerates schemas,
+# which is expensive; run the patch once per process from startup instead of
+# on every module import (autoreload, worker forks).
+import functools
+
+@functools.cache
+def _patch_referer_models():
+    """Relax referer fields to allow empty strings/invalid URLs."""
+    try:
+        import moviebox_api.extractor.models.json as json_models
+        from pydantic import HttpUrl
+        from typing import Union
+
+        relaxed = Union[HttpUrl, str, None]
+        if json_models.MetadataModel.__annotations__.get('referer') == relaxed:
+            # Already patched elsewhere in this process; skip the rebuilds
+            return True
+
+        for model in (json_models.MetadataModel,
+                      json_models.PubParamModel,
+                      json_models.ResDataModel):
+            model.__annotations__['referer'] = relaxed
+            model.model_rebuild(force=True)
+
+        # Rebuild ItemJsonDetailsModel so it picks up the relaxed children
+        json_models.ItemJsonDetailsModel.model_rebuild(force=True)
+
+        logger.info("✅ Successfully patched Pydantic models for empty referer.")
+        return True
+    except Exception as e:
+        logger.exception("❌ Failed to patch models: %s", e)
+        return False
 
 # Catch ValidationError in the routes and fallback
 from pydantic import ValidationError
 
 
-import uuid
+from contextlib import asynccontextmanager
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Build shared state on startup and tear it down on shutdown: patch the
+    upstream models, run the keep-alive pinger, then close every pooled
+    session, the Redis handle and the proxy client.
+    """
+    _patch_referer_models()
+    if _redis is None and int(os.environ.get("WEB_CONCURRENCY", "1") or 1) > 1:
+        logger.warning(
+            "[STARTUP] WEB_CONCURRENCY > 1 without REDIS_URL: stream tokens are "
+            "per-process, so most /v/{token} requests will 404. Set REDIS_URL "
+            "or run a single worker.")
+    keep_alive_task = asyncio.create_task(keep_alive())
+    logger.info("[KEEP-ALIVE] Background ping task started!")
+    try:
+        yield
+    finally:
+        keep_alive_task.cancel()
+        logger.info("[KEEP-ALIVE] Background ping task stopped!")
+        for session in _session_pool.values():
+            if hasattr(session, 'aclose'):
+                await session.aclose()
+        _session_pool.clear()
+        if _redis is not None:
+            await _redis.aclose()
+        await proxy_client.aclose()
+
 app = FastAPI(
     title="CineVerse API",
     description="Professional Movie & TV Streaming API with secure playback.",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # orjson serializes dicts in C and skips jsonable_encoder for plain data,
+    # which matters on JSON-heavy endpoints like /api/home
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Resolve paths
@@ -67,154 +131,318 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 STATIC_DIR = os.path.join(BASE_DIR, "static")
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 
-# Mount static files
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+# --- STATIC FILES ---
+# The static dir is small and fixed at runtime, so read every file into
+# memory once and serve cached bytes with ETag/304 support instead of paying
+# Starlette's per-request stat + file read. Set CINEVERSE_STATIC_FILES=1 to
+# fall back to the stock StaticFiles mount (e.g. while editing assets live).
+import hashlib
+import mimetypes
+
+def _build_static_manifest(root):
+    """Read every static file into {rel_path: (bytes, etag, content_type)}."""
+    manifest = {}
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for name in filenames:
+            full_path = os.path.join(dirpath, name)
+            rel_path = os.path.relpath(full_path, root).replace(os.sep, "/")
+            with open(full_path, "rb") as f:
+                body = f.read()
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            manifest[rel_path] = (body, etag, content_type)
+    return manifest
+
+if os.getenv("CINEVERSE_STATIC_FILES"):
+    app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+else:
+    _static_manifest = _build_static_manifest(STATIC_DIR)
+
+    @app.get("/static/{path:path}", include_in_schema=False)
+    async def serve_static(path: str, request: Request):
+        """Serve a static asset from the in-memory manifest."""
+        entry = _static_manifest.get(path)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        body, etag, content_type = entry
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "public, max-age=31536000, immutable",
+        }
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=content_type, headers=headers)
 
-# Templates
 # Templates
 templates = Jinja2Templates(directory=TEMPLATES_DIR)
 
+# index.html has no request-dependent variables, so read it once and serve
+# the cached bytes instead of re-rendering through Jinja2 on every hit.
+with open(os.path.join(TEMPLATES_DIR, "index.html"), "rb") as f:
+    _index_html_bytes = f.read()
+
+# player.html only needs `fid`; compile the template once at import
+_player_template = templates.env.get_template("player.html")
+
 # --- GLOBAL HTTP CLIENT ---
-# Optimized for streaming high-throughput video
+# Optimized for streaming high-throughput video. http2 lets concurrent
+# chunk/seek requests to the same CDN host multiplex on one connection
+# (falls back to HTTP/1.1 when ALPN doesn't offer h2); keepalive_expiry
+# keeps warm connections around between a player's range requests.
 proxy_client = httpx.AsyncClient(
+    http2=True,
     timeout=httpx.Timeout(60.0, connect=10.0),
-    limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+    limits=httpx.Limits(max_keepalive_connections=50, max_connections=100,
+                        keepalive_expiry=60.0),
     follow_redirects=True
 )
 
 
 
+# Environment is read once at import; these never change at runtime
+_BD_PROXY_URL = os.getenv("BD_PROXY_URL")
+_RENDER_URL = os.getenv("RENDER_EXTERNAL_URL", "http://localhost:8000")
+
 # --- KEEP ALIVE (Prevent Render Free Tier Sleep) ---
 SELF_PING_INTERVAL = 300  # 5 minutes in seconds
-keep_alive_task = None
 
 async def keep_alive():
     """Background task to ping self and prevent Render from sleeping."""
-    import os
-    # Get the render URL from environment, fallback to localhost
-    render_url = os.getenv("RENDER_EXTERNAL_URL", "http://localhost:8000")
-    health_url = f"{render_url}/health"
+    health_url = f"{_RENDER_URL}/health"
     
     while True:
         try:
             await asyncio.sleep(SELF_PING_INTERVAL)
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(health_url)
-                print(f"[KEEP-ALIVE] Pinged {health_url} - Status: {response.status_code}")
+            # Reuse the long-lived client: no fresh TCP+TLS handshake per ping
+            response = await proxy_client.get(health_url, timeout=10.0)
+            logger.debug("[KEEP-ALIVE] Pinged %s - Status: %s", health_url, response.status_code)
         except Exception as e:
-            print(f"[KEEP-ALIVE] Ping failed: {e}")
-
-@app.on_event("startup")
-async def startup_event():
-    """Start the keep-alive background task on server startup."""
-    global keep_alive_task
-    keep_alive_task = asyncio.create_task(keep_alive())
-    print("[KEEP-ALIVE] Background ping task started!")
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    global keep_alive_task
-    if keep_alive_task:
-        keep_alive_task.cancel()
-        print("[KEEP-ALIVE] Background ping task stopped!")
-    await proxy_client.aclose()
+            logger.warning("[KEEP-ALIVE] Ping failed: %s", e)
 
 # --- CACHING ---
-# Simple in-memory cache for faster repeated requests
+# Bounded in-memory cache for faster repeated requests
 from functools import lru_cache
+from cachetools import TTLCache
+import hashlib
 import time
 
-# Cache for movie search results and details (expires after 10 minutes)
-_movie_cache = {}
+# Cache for movie search results and details (expires after 10 minutes).
+# TTLCache handles expiry + LRU eviction, so memory stays bounded.
 _cache_ttl = 600  # 10 minutes
+_movie_cache = TTLCache(maxsize=1024, ttl=_cache_ttl)
+
+# Optional shared cache for multi-worker deployments: with workers > 1 the
+# process-local cache hit rate drops to 1/N and, worse, stream tokens minted
+# by one worker 404 on another. Set REDIS_URL to back the cache and the
+# token map with a store shared by every worker.
+_redis = None
+if os.getenv("REDIS_URL"):
+    try:
+        import redis.asyncio as redis_asyncio
+        _redis = redis_asyncio.from_url(os.getenv("REDIS_URL"))
+        logger.info("[CACHE] Using shared Redis cache")
+    except Exception as e:
+        logger.warning("[CACHE] REDIS_URL set but unusable (%s); using in-process cache", e)
+
+def make_cache_key(prefix, *parts):
+    """Build a short fixed-size cache key by hashing the variable parts."""
+    raw = ":".join(str(p) for p in parts)
+    digest = hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()
+    return f"{prefix}:{digest}"
+
+# The cache is an accelerator, never a dependency: if Redis goes away
+# mid-flight, log once per call and fall back to the in-process cache so
+# endpoints keep working exactly as they do without REDIS_URL.
 
-def get_cached(key):
+async def get_cached(key):
     """Get cached value if not expired."""
-    if key in _movie_cache:
-        value, timestamp = _movie_cache[key]
-        if time.time() - timestamp < _cache_ttl:
-            return value
-        del _movie_cache[key]
-    return None
+    if _redis is not None:
+        try:
+            body = await _redis.get(key)
+            return orjson.loads(body) if body is not None else None
+        except Exception as e:
+            logger.warning("[CACHE] Redis get failed (%s); using in-process cache", e)
+    return _movie_cache.get(key)
+
+async def set_cached(key, value):
+    """Cache a value (TTL handled by the backing store)."""
+    if _redis is not None:
+        try:
+            await _redis.set(key, orjson.dumps(value), ex=_cache_ttl)
+            return
+        except Exception as e:
+            logger.warning("[CACHE] Redis set failed (%s); using in-process cache", e)
+    _movie_cache[key] = value
 
-def set_cached(key, value):
-    """Cache a value with current timestamp."""
-    _movie_cache[key] = (value, time.time())
+async def del_cached(key):
+    """Drop a cached value if present."""
+    if _redis is not None:
+        try:
+            await _redis.delete(key)
+            return
+        except Exception as e:
+            logger.warning("[CACHE] Redis delete failed (%s); using in-process cache", e)
+    _movie_cache.pop(key, None)
+
+async def get_cached_bytes(key):
+    """Like get_cached, for values stored as pre-serialized bytes."""
+    if _redis is not None:
+        try:
+            return await _redis.get(key)
+        except Exception as e:
+            logger.warning("[CACHE] Redis get failed (%s); using in-process cache", e)
+    return _movie_cache.get(key)
+
+async def set_cached_bytes(key, body):
+    """Like set_cached, for pre-serialized bytes payloads."""
+    if _redis is not None:
+        try:
+            await _redis.set(key, body, ex=_cache_ttl)
+            return
+        except Exception as e:
+            logger.warning("[CACHE] Redis set failed (%s); using in-process cache", e)
+    _movie_cache[key] = body
+
+@lru_cache(maxsize=256)
+def _etag_for(body):
+    """ETag for a serialized payload (memoized: cached bodies repeat)."""
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+def _conditional_json(request, payload=None, body=None,
+                      cache_control="public, max-age=300, stale-while-revalidate=600"):
+    """
+    Serve a JSON payload with ETag/Cache-Control headers, answering a
+    matching If-None-Match with a bodyless 304.
+    """
+    if body is None:
+        body = orjson.dumps(payload)
+    etag = _etag_for(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# In-flight upstream fetches keyed by cache key, so N concurrent misses
+# for the same title result in exactly one upstream roundtrip.
+_inflight = {}
+
+async def _single_flight(key, coro_factory):
+    """
+    Run coro_factory at most once per key at a time.
+    The first caller does the real work; concurrent callers await the
+    same Future and share its result. Successful results are cached.
+    """
+    cached = await get_cached(key)
+    if cached is not None:
+        return cached
+
+    fut = _inflight.get(key)
+    if fut is not None:
+        return await fut
+
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    try:
+        result = await coro_factory()
+        # Don't cache error payloads (same behavior as before)
+        if not (isinstance(result, dict) and "error" in result):
+            await set_cached(key, result)
+        fut.set_result(result)
+        return result
+    except Exception as e:
+        fut.set_exception(e)
+        fut.exception()  # mark retrieved in case nobody is waiting
+        raise
+    finally:
+        _inflight.pop(key, None)
 
 # --- HELPERS ---
 
+# Base headers shared by every session; copied per session construction
+_BASE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Origin': 'http://h5.aoneroom.com',
+    'Referer': 'http://h5.aoneroom.com/',
+    'CF-IPCountry': 'BD',
+    'Accept-Language': 'bn-BD,bn;q=0.9,en-US;q=0.8,en;q=0.7',
+    'X-Client-Country': 'BD',
+    'X-Country-Code': 'BD',
+    'X-Time-Zone': 'Asia/Dhaka',
+    'X-Locale': 'bn_BD'
+}
+
+# Long-lived sessions keyed by (is_localhost, proxy_url). Headers are the
+# same for every request except the forwarded-IP pair, which is patched per
+# call, so a handful of sessions cover all request shapes and their
+# connection pools stay warm. Closed in shutdown_event.
+_session_pool = {}
+
 def get_session(client_ip=None):
     """
-    Create a session.
+    Get a pooled session.
     - For Localhost: Use natural connection (uses your PC's BD IP).
     - For Render/Remote: Forward the real client's IP.
     """
     is_localhost = not client_ip or client_ip in ["127.0.0.1", "localhost", "::1"]
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Origin': 'http://h5.aoneroom.com',
-        'Referer': 'http://h5.aoneroom.com/',
-        'CF-IPCountry': 'BD',
-        'Accept-Language': 'bn-BD,bn;q=0.9,en-US;q=0.8,en;q=0.7',
-        'X-Client-Country': 'BD',
-        'X-Country-Code': 'BD',
-        'X-Time-Zone': 'Asia/Dhaka',
-        'X-Locale': 'bn_BD'
-    }
+    key = (is_localhost, _BD_PROXY_URL)
+
+    session = _session_pool.get(key)
+    if session is None:
+        headers = dict(_BASE_HEADERS)
+        if _BD_PROXY_URL:
+            logger.info("[SESSION] Using Real Proxy: %s", _BD_PROXY_URL)
+            session = Session(proxy=_BD_PROXY_URL, headers=headers)
+        else:
+            session = Session(headers=headers)
+        _session_pool[key] = session
 
     # Only forward IP if it's NOT localhost (Real User on Render)
     if not is_localhost:
-        headers['X-Forwarded-For'] = client_ip
-        headers['X-Real-IP'] = client_ip
+        session.headers['X-Forwarded-For'] = client_ip
+        session.headers['X-Real-IP'] = client_ip
     # else: Localhost -> No IP headers -> Uses your real PC IP (BD)
 
-    # Check for actual Proxy URL (optional override)
-    proxy_url = os.getenv("BD_PROXY_URL")
-    if proxy_url:
-        print(f"[SESSION] Using Real Proxy: {proxy_url}")
-        return Session(proxy=proxy_url, headers=headers)
-    
-    return Session(headers=headers)
+    return session
 
 def get_image_url(item):
-    # Try 'image', then 'cover', then 'img'
+    # EAFP fast path: item.image.url is the dominant shape for moviebox_api
+    # models and an untaken except is free in CPython
+    try:
+        return str(item.image.url)
+    except AttributeError:
+        pass
+    # Slow path: 'cover'/'img' fallbacks, dicts, raw strings
     img_obj = getattr(item, 'image', getattr(item, 'cover', getattr(item, 'img', None)))
-    
-    # If it's a model with 'url' attribute
     if hasattr(img_obj, 'url'):
         return str(img_obj.url)
-    # If it's a dict and has 'url'
     if isinstance(img_obj, dict) and 'url' in img_obj:
         return str(img_obj['url'])
-    # If it's already a string
     if isinstance(img_obj, str):
         return img_obj
     return ''
 
 def get_title(item):
-    return getattr(item, 'title', getattr(item, 'name', ''))
+    try:
+        return item.title
+    except AttributeError:
+        return getattr(item, 'name', '')
 
 def get_id(item):
-    # Try id, subjectId
-    val = getattr(item, 'id', getattr(item, 'subjectId', ''))
-    return str(val)
+    # Try id, then subjectId
+    try:
+        return str(item.id)
+    except AttributeError:
+        return str(getattr(item, 'subjectId', ''))
 
 async def search_movie_by_title(title: str, session):
     """Search for a movie by title and return the first MOVIE result (not TV series)."""
     s = Search(session=session, query=title)
     results = await s.get_content_model()
     if results.items and len(results.items) > 0:
-        # Try to find a movie (subjectType == 1 or MOVIES)
+        # Try to find a movie (SubjectType.MOVIES = 1)
         for item in results.items:
-            subject_type = getattr(item, 'subjectType', None)
-            # SubjectType.MOVIES = 1
-            if subject_type is not None:
-                if hasattr(subject_type, 'value'):
-                    if subject_type.value == 1:
-                        return item
-                elif subject_type == 1:
-                    return item
+            if _subject_kind(item) == 1:
+                return item
         # Fallback: return first item anyway
         return results.items[0]
     return None
@@ -227,14 +455,35 @@ async def search_content_by_title(title: str, session):
         return results.items[0]
     return None
 
+# Attribute names that may hold a homepage section's sub-items, most likely
+# first: one getattr probe per attr instead of a hasattr+access pair each.
+_SUB_ITEM_ATTRS = ('items', 'subjectList', 'bannerList', 'subjects')
+
+def _extract_sub_items(op):
+    """Find the list of sub-items on a homepage section model."""
+    for attr in _SUB_ITEM_ATTRS:
+        value = getattr(op, attr, None)
+        if value:
+            return value
+    banner = getattr(op, 'banner', None)
+    if banner is not None:
+        if isinstance(banner, list):
+            return banner
+        items = getattr(banner, 'items', None)
+        if items:
+            return items
+    return []
+
+def _subject_kind(item):
+    """Return the numeric subjectType of an item (0 if unknown)."""
+    st = getattr(item, 'subjectType', None)
+    if st is None:
+        return 0
+    return getattr(st, 'value', st)
+
 def is_tv_series(item):
     """Check if an item is a TV series (subjectType == 2)."""
-    subject_type = getattr(item, 'subjectType', None)
-    if subject_type is not None:
-        if hasattr(subject_type, 'value'):
-            return subject_type.value == 2
-        return subject_type == 2
-    return False
+    return _subject_kind(item) == 2
 
 # --- ROUTES ---
 
@@ -243,13 +492,13 @@ def is_tv_series(item):
 @app.get("/tv", response_class=HTMLResponse)
 @app.get("/animation", response_class=HTMLResponse)
 async def read_root(request: Request):
-    """Render the homepage."""
-    return templates.TemplateResponse("index.html", {"request": request})
+    """Serve the pre-rendered homepage."""
+    return HTMLResponse(content=_index_html_bytes)
 
 @app.get("/player/{fid}", response_class=HTMLResponse)
 async def player_page(request: Request, fid: str):
-    """Render the player page."""
-    return templates.TemplateResponse("player.html", {"request": request, "fid": fid})
+    """Render the player page (template precompiled at import)."""
+    return HTMLResponse(content=_player_template.render(fid=fid))
 
 # --- API ENDPOINTS ---
 
@@ -274,35 +523,32 @@ async def get_home_content(request: Request, mode: str = "full"):
     - 'full': Get everything (default)
     - 'init': Get Banner + Top 2 Rows (Fast load)
     - 'more': Get the rest of the rows
+    - 'stream': NDJSON, one section per line (progressive render)
     """
     client_ip = get_client_ip(request)
-    # print(f"[HOME] Request from: {client_ip}")
     session = get_session(client_ip)
     try:
-        # 1. Check Cache
+        # 1. Fetch sections (cached / coalesced across concurrent requests)
         cache_key = "home_content_full"
-        cached_data = get_cached(cache_key)
-        
-        sections = []
-        
-        if cached_data:
-            print("[HOME] Cache Hit")
-            sections = cached_data
-        else:
-            print("[HOME] Cache Miss - Fetching from Upstream...")
+
+        async def _fetch_sections():
+            logger.debug("[HOME] Cache Miss - Fetching from Upstream...")
             hp = Homepage(session=session)
             content = await hp.get_content_model()
-            
+
+            sections = []
+
             # Process data for frontend
-            
+
             # Add Banner (using 'contents' or 'banner')
-            banner_items = []
-            if hasattr(content, 'contents') and content.contents:
-                 banner_items = content.contents
-            elif hasattr(content, 'banner') and isinstance(content.banner, list):
-                 banner_items = content.banner
-            elif hasattr(content, 'bannerList') and content.bannerList:
-                 banner_items = content.bannerList
+            banner_items = getattr(content, 'contents', None)
+            if not banner_items:
+                banner = getattr(content, 'banner', None)
+                if isinstance(banner, list):
+                    banner_items = banner
+                else:
+                    banner_items = getattr(content, 'bannerList', None)
+            banner_items = banner_items or []
     
             if banner_items:
                 sections.append({
@@ -324,33 +570,19 @@ async def get_home_content(request: Request, mode: str = "full"):
                     section_title = getattr(op, 'title', getattr(op, 'name', 'Unknown'))
                     
                     # Find sub-items
-                    sub_items = []
-                    if hasattr(op, 'items'): sub_items = op.items
-                    elif hasattr(op, 'subjectList'): sub_items = op.subjectList
-                    elif hasattr(op, 'bannerList'): sub_items = op.bannerList
-                    elif hasattr(op, 'subjects'): sub_items = op.subjects
-                    elif hasattr(op, 'banner'):
-                        if isinstance(op.banner, list):
-                            sub_items = op.banner
-                        elif hasattr(op.banner, 'items'):
-                            sub_items = op.banner.items
+                    sub_items = _extract_sub_items(op)
     
                     if sub_items:
                         clean_items = []
                         for item in sub_items:
                              img_url = get_image_url(item)
                              if img_url: 
-                                 is_movie = True
-                                 subject_type = getattr(item, 'subjectType', None)
-                                 if subject_type is not None:
-                                     if hasattr(subject_type, 'value'): is_movie = subject_type.value == 1
-                                     else: is_movie = subject_type == 1
-                                 if hasattr(item, 'subject') and item.subject:
-                                     st = getattr(item.subject, 'subjectType', None)
-                                     if st is not None:
-                                         if hasattr(st, 'value'): is_movie = st.value == 1
-                                         else: is_movie = st == 1
-                                             
+                                 kind = _subject_kind(item)
+                                 subject = getattr(item, 'subject', None)
+                                 if subject:
+                                     kind = _subject_kind(subject) or kind
+                                 is_movie = (kind == 1) if kind else True
+
                                  clean_items.append({
                                     "title": get_title(item),
                                     "id": get_id(item),
@@ -366,37 +598,102 @@ async def get_home_content(request: Request, mode: str = "full"):
                                 "items": clean_items
                             })
             
-            # Cache the full processed sections list
-            set_cached(cache_key, sections)
-            print(f"[HOME] Cached {len(sections)} sections")
+            logger.debug("[HOME] Built %d sections", len(sections))
+            # Invalidate the serialized variant so it re-syncs with this fetch
+            await del_cached("home_content_full_bytes")
+            return sections
+
+        sections = await _single_flight(cache_key, _fetch_sections)
 
         # 2. Slice based on mode
-        response_sections = []
+        if mode == 'stream':
+            # One JSON line per section so the client can render rows as they
+            # arrive instead of waiting on the full blob. The generator must
+            # be async: sync generators get offloaded to the thread pool.
+            async def section_lines():
+                for section in sections:
+                    yield orjson.dumps(section) + b"\n"
+            return StreamingResponse(section_lines(), media_type="application/x-ndjson")
+
         if mode == 'init':
             # Banner (if exists) + Top 2 rows
-            # Usually Index 0 is Banner. 
-            count = 0
+            # Usually Index 0 is Banner.
             limit = 3 # Banner + 2 rows
-            response_sections = sections[:limit]
+            return _conditional_json(request, payload={"sections": sections[:limit]})
         elif mode == 'more':
             # All excluding top 3
-            response_sections = sections[3:] if len(sections) > 3 else []
-        else:
-            response_sections = sections
-
-        return {"sections": response_sections}
+            return _conditional_json(request, payload={"sections": sections[3:] if len(sections) > 3 else []})
+
+        # Full mode is the hottest path: serialize the payload once per cache
+        # fill and serve the raw bytes afterwards instead of re-encoding the
+        # whole sections list on every request.
+        body = await get_cached_bytes("home_content_full_bytes")
+        if body is None:
+            body = orjson.dumps({"sections": sections})
+            await set_cached_bytes("home_content_full_bytes", body)
+        return _conditional_json(request, body=body)
         
     except Exception as e:
-        print(f"Error fetching home: {e}")
+        logger.exception("Error fetching home: %s", e)
         return {"error": str(e)}
-    finally:
-        if hasattr(session, 'aclose'): await session.aclose()
 
 
 
 
 # --- HELPER: Professional Filename Generator ---
 import re
+
+# Compiled once: make_secure_url runs per quality entry per details call
+_SAFE_TITLE_RE = re.compile(r'[^\w\s\-\.]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Episode numbers inside an allEp string like "1, 2, 3"
+_EP_RE = re.compile(r'\d+')
+
+import operator
+
+def _parse_res_int(value):
+    """Resolution as an int (720 for '720p'/'720P'); 0 when unknown."""
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value).lower().rstrip('p'))
+    except (ValueError, TypeError):
+        return 0
+
+# Sort key for quality dicts carrying a precomputed '_res_int'
+_RES_KEY = operator.itemgetter('_res_int')
+
+def _res_sort_key(item):
+    """Sort key for quality dicts that only carry 'resolution'."""
+    return _parse_res_int(item['resolution'])
+
+async def _tokenized_qualities(entries, display_title):
+    """
+    Build API quality dicts from cached {label,size,resolution,res_int,
+    real_url} entries, minting a fresh token per entry (tokens are never
+    cached; only the stable upstream URLs are).
+    """
+    qualities = []
+    for entry in entries:
+        token = token_hex(16)
+        await _store_stream_token(token, entry["real_url"])
+        qualities.append({
+            "label": entry["label"],
+            "url": make_secure_url(token, display_title, entry["label"]),
+            "size": entry["size"],
+            "resolution": entry["resolution"],
+            "_res_int": entry["res_int"]
+        })
+    return qualities
+
+@lru_cache(maxsize=2048)
+def _sanitize_title(title):
+    """Sanitize a title for URLs: strip special chars, spaces -> dots."""
+    safe_title = str(title).strip()
+    safe_title = _SAFE_TITLE_RE.sub('', safe_title)
+    return _WHITESPACE_RE.sub('.', safe_title)
+
 def make_pro_filename(title, year=None, quality=None, is_tv=False, season=None, episode=None):
     # Simplified for internal metadata if needed, but not for URL
     return f"{title}.mp4"
@@ -414,18 +711,14 @@ def format_duration(seconds):
         return "N/A"
 
 def make_secure_url(token, title, quality="HD"):
-    import time
-    import random
-    
-    # Sanitize title for URL: Space -> Dot, remove special chars
-    safe_title = str(title).strip()
-    safe_title = re.sub(r'[^\w\s\-\.]', '', safe_title)
-    safe_title = re.sub(r'\s+', '.', safe_title)
-    
+    # Sanitize title for URL: Space -> Dot, remove special chars (memoized --
+    # the same title repeats across quality variants)
+    safe_title = _sanitize_title(title)
+
     # Generate OTT-style secure URL structure
     # Format: /v/{token}/{Title}.{Quality}.mp4?exp={timestamp}&sig={signature}
     exp = int(time.time()) + 21600 # 6 hours expiry
-    sig = uuid.uuid4().hex[:8]
+    sig = token_hex(4)
     
     # Clean quality string
     q_str = str(quality).replace(" ", "").replace(".", "")
@@ -444,182 +737,234 @@ async def get_details(request: Request, title: str, include_stream: bool = True,
     """
     
     # Check cache first
-    cache_key = f"details:{title}:{include_stream}"
-    cached = get_cached(cache_key)
+    cache_key = make_cache_key("details", title, include_stream)
+    cached = await get_cached(cache_key)
     if cached:
-        print(f"[DETAILS] Cache hit for: {title}")
-        return cached
+        logger.debug("[DETAILS] Cache hit for: %s", title)
+        return _conditional_json(request, payload=cached)
     
     client_ip = get_client_ip(request)
     session = get_session(client_ip)
-    movie = None
-    
     try:
-        if id and slug:
-            print(f"[DETAILS] ⚡ Fast fetching with ID: {id}")
-            # Construct URL manually to skip search
-            page_url = f"{ITEM_DETAILS_PATH}/{slug}?id={id}"
-            movie = MovieDetails(page_url, session=session)
-        else:
-            # Search for the movie first
-            print(f"[DETAILS] 🐢 Searching by title: {title}")
-            movie = await search_movie_by_title(title, session)
+        async def _fetch_full():
+            movie = None
+            if id and slug:
+                logger.debug("[DETAILS] ⚡ Fast fetching with ID: %s", id)
+                # Construct URL manually to skip search
+                page_url = f"{ITEM_DETAILS_PATH}/{slug}?id={id}"
+                movie = MovieDetails(page_url, session=session)
+            else:
+                # Search for the movie first
+                logger.debug("[DETAILS] 🐢 Searching by title: %s", title)
+                movie = await search_movie_by_title(title, session)
             
-        if not movie:
-            return {"error": f"Movie '{title}' not found"}
+            if not movie:
+                return {"error": f"Movie '{title}' not found"}
         
-        # Define async functions for parallel fetching
-        async def fetch_details():
-            try:
-                md = MovieDetails(movie, session=session)
+            # Define async functions for parallel fetching
+            async def fetch_details():
                 try:
-                    json_details = await md.get_json_details_extractor_model()
+                    md = MovieDetails(movie, session=session)
+                    try:
+                        json_details = await md.get_json_details_extractor_model()
                     
-                    # Normal processing
-                    subject = json_details.subject
-                    directors = []
-                    cast = []
-                    if json_details.stars:
-                        for s in json_details.stars:
-                            if s.character and 'Director' in s.character:
-                                directors.append(s.name)
-                            elif hasattr(s, 'staffType') and s.staffType == 2:
-                                directors.append(s.name)
-                            else:
-                                cast.append(s.name)
-
-                    trailer_url = None
-                    trailer_img = None
-                    if hasattr(subject, 'trailer') and subject.trailer:
-                        if subject.trailer.videoAddress:
-                            trailer_url = str(subject.trailer.videoAddress.url)
-                        if subject.trailer.cover:
-                            trailer_img = str(subject.trailer.cover.url)
+                        # Normal processing
+                        subject = json_details.subject
+                        directors = []
+                        cast = []
+                        if json_details.stars:
+                            for s in json_details.stars:
+                                if s.character and 'Director' in s.character:
+                                    directors.append(s.name)
+                                elif hasattr(s, 'staffType') and s.staffType == 2:
+                                    directors.append(s.name)
+                                else:
+                                    cast.append(s.name)
+
+                        trailer_url = None
+                        trailer_img = None
+                        if hasattr(subject, 'trailer') and subject.trailer:
+                            if subject.trailer.videoAddress:
+                                trailer_url = str(subject.trailer.videoAddress.url)
+                            if subject.trailer.cover:
+                                trailer_img = str(subject.trailer.cover.url)
+
+                        return {
+                            "title": subject.title,
+                            "description": subject.description,
+                            "year": str(subject.releaseDate) if subject.releaseDate else 'N/A',
+                            "rating": getattr(subject, 'imdbRatingValue', 'N/A'),
+                            "image": get_image_url(subject),
+                            "actors": cast,
+                            "directors": directors,
+                            "genre": subject.genre if subject.genre else [],
+                            "duration": format_duration(getattr(subject, 'duration', 0)),
+                            "country": getattr(subject, 'countryName', 'N/A'),
+                            "trailerUrl": trailer_url,
+                            "trailerImage": trailer_img,
+                            "id": get_id(movie)
+                        }
+                    except (ValidationError, Exception) as ve:
+                        logger.warning("[DETAILS] Validation Error in MovieDetails: %s", ve)
+                        # Fallback to search result data
+                        raise Exception("Validation failed, fallback to basics")
 
+                except Exception as e:
+                    logger.warning("[DETAILS] MovieDetails failed, using search result: %s", e)
                     return {
-                        "title": subject.title,
-                        "description": subject.description,
-                        "year": str(subject.releaseDate) if subject.releaseDate else 'N/A',
-                        "rating": getattr(subject, 'imdbRatingValue', 'N/A'),
-                        "image": get_image_url(subject),
-                        "actors": cast,
-                        "directors": directors,
-                        "genre": subject.genre if subject.genre else [],
-                        "duration": format_duration(getattr(subject, 'duration', 0)),
-                        "country": getattr(subject, 'countryName', 'N/A'),
-                        "trailerUrl": trailer_url,
-                        "trailerImage": trailer_img,
-                        "id": get_id(movie)
+                        "title": getattr(movie, 'title', title),
+                        "description": getattr(movie, 'description', 'No description available.'),
+                        "year": str(getattr(movie, 'releaseDate', 'N/A')),
+                        "rating": getattr(movie, 'imdbRatingValue', 'N/A'),
+                        "image": get_image_url(movie),
+                        "actors": [],
+                        "genre": getattr(movie, 'genre', []) or []
                     }
-                except (ValidationError, Exception) as ve:
-                    print(f"[DETAILS] Validation Error in MovieDetails: {ve}")
-                    # Fallback to search result data
-                    raise Exception("Validation failed, fallback to basics")
-
-            except Exception as e:
-                print(f"[DETAILS] MovieDetails failed, using search result: {e}")
-                return {
-                    "title": getattr(movie, 'title', title),
-                    "description": getattr(movie, 'description', 'No description available.'),
-                    "year": str(getattr(movie, 'releaseDate', 'N/A')),
-                    "rating": getattr(movie, 'imdbRatingValue', 'N/A'),
-                    "image": get_image_url(movie),
-                    "actors": [],
-                    "genre": getattr(movie, 'genre', []) or []
-                }
         
-        async def fetch_stream():
-            if not include_stream:
-                return None
-            try:
-                downloadable_details = DownloadableMovieFilesDetail(session, movie)
-                download_metadata = await downloadable_details.get_content_model()
-                if download_metadata:
-                    # Extract qualities logic (reused)
-                    qualities = []
-                    if hasattr(download_metadata, 'downloads'):
-                        for d in download_metadata.downloads:
-                            res = getattr(d, 'resolution', None)
-                            size = getattr(d, 'size', None)
-                            d_url = getattr(d, 'url', None)
-                            if d_url:
-                                # Secure Token Generation
-                                token = str(uuid.uuid4().hex)
-                                _stream_map[token] = str(d_url)
+            async def fetch_stream():
+                if not include_stream:
+                    return None
+                try:
+                    downloadable_details = DownloadableMovieFilesDetail(session, movie)
+                    download_metadata = await downloadable_details.get_content_model()
+                    if download_metadata:
+                        # Extract qualities logic (reused)
+                        qualities = []
+                        if hasattr(download_metadata, 'downloads'):
+                            for d in download_metadata.downloads:
+                                res = getattr(d, 'resolution', None)
+                                size = getattr(d, 'size', None)
+                                d_url = getattr(d, 'url', None)
+                                if d_url:
+                                    # Secure Token Generation
+                                    token = token_hex(16)
+                                    await _store_stream_token(token, str(d_url))
                                 
-                                # OTT Style URL
-                                q_label = f"{res}p" if res else "720p"
-                                secure_url = make_secure_url(token, movie.title, q_label)
+                                    # OTT Style URL
+                                    q_label = f"{res}p" if res else "720p"
+                                    secure_url = make_secure_url(token, movie.title, q_label)
                                 
-                                qualities.append({
-                                    "label": q_label,
-                                    "url": secure_url,
-                                    "size": size,
-                                    "resolution": res
-                                })
+                                    qualities.append({
+                                        "label": q_label,
+                                        "url": secure_url,
+                                        "size": size,
+                                        "resolution": res
+                                    })
                     
-                    # Sort qualities
-                    def get_res_val(item):
-                        try: return int(str(item['resolution']).replace('p', ''))
-                        except: return 0
-                    qualities.sort(key=get_res_val, reverse=True)
+                        # Sort qualities
+                        qualities.sort(key=_res_sort_key, reverse=True)
 
-                    # Determine stream url
-                    try:
-                        media_file = resolve_media_file_to_be_downloaded("720P", download_metadata)
-                    except:
+                        # Determine stream url
                         try:
-                            media_file = resolve_media_file_to_be_downloaded("BEST", download_metadata)
+                            media_file = resolve_media_file_to_be_downloaded("720P", download_metadata)
                         except:
-                            # Fallback if resolve fails but we have downloads
-                            if qualities:
-                                # Return with tokenized quality URLs
-                                return {
-                                    "streamUrl": qualities[0]['url'], # This is now /stream/{token}
-                                    "streamReferer": "https://fmoviesunblocked.net/",
-                                    "qualities": qualities
-                                }
-                            return None
-
-                    # If resolving was successful, we also need to mask this if no qualities list or just fallback
-                    # Fallback stream generation
-                    real_url = str(media_file.url)
-                    token = str(uuid.uuid4().hex)
-                    _stream_map[token] = real_url
+                            try:
+                                media_file = resolve_media_file_to_be_downloaded("BEST", download_metadata)
+                            except:
+                                # Fallback if resolve fails but we have downloads
+                                if qualities:
+                                    # Return with tokenized quality URLs
+                                    return {
+                                        "streamUrl": qualities[0]['url'], # This is now /stream/{token}
+                                        "streamReferer": "https://fmoviesunblocked.net/",
+                                        "qualities": qualities
+                                    }
+                                return None
+
+                        # If resolving was successful, we also need to mask this if no qualities list or just fallback
+                        # Fallback stream generation
+                        real_url = str(media_file.url)
+                        token = token_hex(16)
+                        await _store_stream_token(token, real_url)
                     
-                    return {
-                        "streamUrl": make_secure_url(token, movie.title, "Auto"),
-                        "streamReferer": "https://fmoviesunblocked.net/",
-                        "qualities": qualities
-                    }
-            except Exception as e:
-                print(f"[DETAILS] Stream fetch error: {e}")
-                return {"streamError": str(e)}
-            return None
-        
-        # Fetch details and stream URL in PARALLEL for speed
-        results = await asyncio.gather(fetch_details(), fetch_stream())
-        
-        data = results[0]  # Movie details
-        stream_data = results[1]  # Stream URL
+                        return {
+                            "streamUrl": make_secure_url(token, movie.title, "Auto"),
+                            "streamReferer": "https://fmoviesunblocked.net/",
+                            "qualities": qualities
+                        }
+                except Exception as e:
+                    logger.warning("[DETAILS] Stream fetch error: %s", e)
+                    return {"streamError": str(e)}
+                return None
         
-        if stream_data:
-            data.update(stream_data)
-            if "streamUrl" in stream_data:
-                print(f"[DETAILS] Stream URL included")
+            # Fetch details and stream URL in PARALLEL for speed.
+            # TaskGroup cancels the sibling task if one branch raises,
+            # instead of letting it run to completion uselessly like gather.
+            async with asyncio.TaskGroup() as tg:
+                details_task = tg.create_task(fetch_details())
+                stream_task = tg.create_task(fetch_stream())
+
+            data = details_task.result()  # Movie details
+            stream_data = stream_task.result()  # Stream URL
         
-        # Cache the result
-        set_cached(cache_key, data)
+            if stream_data:
+                data.update(stream_data)
+                if "streamUrl" in stream_data:
+                    logger.debug("[DETAILS] Stream URL included")
         
-        return data
+            return data
+
+        data = await _single_flight(cache_key, _fetch_full)
+        if isinstance(data, dict) and "error" in data:
+            return data
+        return _conditional_json(request, payload=data)
             
     except Exception as e:
-        print(f"[DETAILS] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[DETAILS] Error: %s", e)
         return {"error": str(e)}
-    finally:
-        if hasattr(session, 'aclose'): await session.aclose()
+
+
+def _build_season(season, image):
+    """
+    Build one {"seasonNumber", "totalEpisodes", "episodes"} dict from a
+    season model. Pure CPU over the already-fetched details payload -
+    there is no per-season upstream call, so seasons are mapped in a
+    single pass rather than awaited individually.
+    """
+    try:
+        season_num = int(getattr(season, 'se', 1))
+    except:
+        season_num = 1
+
+    all_ep_str = getattr(season, 'allEp', '')
+
+    # Shared fields for every episode of this season
+    ep_base = {"image": image, "seasonNum": season_num}
+
+    # Parse episode numbers with one C-level regex scan
+    # instead of strip/isdigit per comma-split element
+    episodes = []
+    if all_ep_str:
+        ep_numbers = map(int, _EP_RE.findall(all_ep_str))
+        episodes = [
+            {**ep_base, "episodeNumber": ep_num, "title": f"Episode {ep_num}"}
+            for ep_num in ep_numbers
+        ]
+
+    # Fallback: if no episodes found from allEp, use maxEp
+    if not episodes:
+        max_ep_raw = getattr(season, 'maxEp', 0)
+        try:
+            max_ep = int(max_ep_raw)
+        except (ValueError, TypeError):
+            max_ep = 0
+
+        if max_ep > 0:
+            logger.debug("[TV] Season %s: allEp missing, using maxEp=%s to generate episodes", season_num, max_ep)
+            episodes = [
+                {**ep_base, "episodeNumber": ep_num, "title": f"Episode {ep_num}"}
+                for ep_num in range(1, max_ep + 1)
+            ]
+
+    # Double check we have episodes
+    if not episodes:
+        logger.debug("[TV] Season %s: No episodes found via allEp or maxEp.", season_num)
+
+    return {
+        "seasonNumber": season_num,
+        "totalEpisodes": len(episodes),
+        "episodes": episodes
+    }
 
 
 @app.get("/api/tv_details/{title:path}", tags=["TV Series"], summary="Get TV Series Details")
@@ -629,184 +974,154 @@ async def get_tv_details(request: Request, title: str):
     """
     
     # Check cache first
-    cache_key = f"tv_details_v2:{title}"
-    cached = get_cached(cache_key)
+    cache_key = make_cache_key("tv_details_v2", title)
+    cached = await get_cached(cache_key)
     if cached:
-        print(f"[TV] Cache hit for: {title}")
-        return cached
+        logger.debug("[TV] Cache hit for: %s", title)
+        return _conditional_json(request, payload=cached)
     
     client_ip = get_client_ip(request)
     session = get_session(client_ip)
     
     try:
-        # Search for the content - try different variations
-        from moviebox_api.exceptions import ZeroSearchResultsError
-        
-        content = None
-        search_queries = [
-            title,
-            title.replace("[Hindi]", "").replace("[Bengali]", "").strip(),
-            title.split("[")[0].strip() if "[" in title else title
-        ]
+        async def _fetch_tv():
+            # Search for the content - try different variations
+            from moviebox_api.exceptions import ZeroSearchResultsError
         
-        for query in search_queries:
+            content = None
+            # Dedupe while keeping priority order (variants are often identical)
+            search_queries = list(dict.fromkeys([
+                title,
+                title.replace("[Hindi]", "").replace("[Bengali]", "").strip(),
+                title.split("[")[0].strip() if "[" in title else title
+            ]))
+
+            # Fire all query variants in parallel; first hit wins and the
+            # rest are cancelled, so a miss on the raw title no longer costs
+            # a full sequential roundtrip per variant.
+            tasks = [asyncio.create_task(search_content_by_title(query, session))
+                     for query in search_queries]
             try:
-                content = await search_content_by_title(query, session)
-                if content:
-                    print(f"[TV] Found with query: {query}")
-                    break
-            except ZeroSearchResultsError:
-                continue
-            except Exception as e:
-                print(f"[TV] Search error for '{query}': {e}")
-                continue
+                for coro in asyncio.as_completed(tasks):
+                    try:
+                        result = await coro
+                        if result:
+                            content = result
+                            logger.debug("[TV] Found result for: %s", title)
+                            break
+                    except ZeroSearchResultsError:
+                        continue
+                    except Exception as e:
+                        logger.warning("[TV] Search error for '%s': %s", title, e)
+                        continue
+            finally:
+                for task in tasks:
+                    task.cancel()
+                # cancel() is a no-op on tasks that already finished; drain
+                # them all so an abandoned variant's ZeroSearchResultsError
+                # isn't logged as "Task exception was never retrieved" at GC
+                await asyncio.gather(*tasks, return_exceptions=True)
         
-        if not content:
-            return {"error": f"Could not find '{title}'. Try searching with a simpler name."}
+            if not content:
+                return {"error": f"Could not find '{title}'. Try searching with a simpler name."}
         
-        # Check if it's actually a TV series
-        is_series = is_tv_series(content)
-        if not is_series:
-            return {"error": "This item is a movie, not a TV series. Use the movie modal instead."}
+            # Check if it's actually a TV series
+            is_series = is_tv_series(content)
+            if not is_series:
+                return {"error": "This item is a movie, not a TV series. Use the movie modal instead."}
         
-        # Get details
-        try:
-            from moviebox_api import TVSeriesDetails
-            td = TVSeriesDetails(content, session=session)
-            details = await td.get_json_details_extractor_model()
-            subject = details.subject
+            # Get details
+            try:
+                from moviebox_api import TVSeriesDetails
+                td = TVSeriesDetails(content, session=session)
+                details = await td.get_json_details_extractor_model()
+                subject = details.subject
             
-            # Extract Directors and Cast
-            directors = []
-            cast = []
-            if details.stars:
-                for s in details.stars:
-                    if s.character == 'Director' or (hasattr(s, 'staffType') and s.staffType == 2):
-                        directors.append(s.name)
-                    else:
-                        cast.append(s.name)
+                # Extract Directors and Cast
+                directors = []
+                cast = []
+                if details.stars:
+                    for s in details.stars:
+                        if s.character == 'Director' or (hasattr(s, 'staffType') and s.staffType == 2):
+                            directors.append(s.name)
+                        else:
+                            cast.append(s.name)
             
-            # Extract Trailer
-            trailer_url = None
-            trailer_img = None
-            if hasattr(subject, 'trailer') and subject.trailer:
-                if subject.trailer.videoAddress:
-                     trailer_url = str(subject.trailer.videoAddress.url)
-                if subject.trailer.cover:
-                     trailer_img = str(subject.trailer.cover.url)
-
-            data = {
-                "title": subject.title,
-                "description": subject.description,
-                "year": str(subject.releaseDate) if subject.releaseDate else 'N/A',
-                "rating": getattr(subject, 'imdbRatingValue', 'N/A'),
-                "image": get_image_url(subject),
-                "actors": cast,
-                "directors": directors,
-                "genre": subject.genre if subject.genre else [],
-                "duration": format_duration(getattr(subject, 'duration', 0)),
-                "country": getattr(subject, 'countryName', 'N/A'),
-                "trailerUrl": trailer_url,
-                "trailerImage": trailer_img,
-                "isTvSeries": True,
-                "seasons": []
-            }
+                # Extract Trailer
+                trailer_url = None
+                trailer_img = None
+                if hasattr(subject, 'trailer') and subject.trailer:
+                    if subject.trailer.videoAddress:
+                         trailer_url = str(subject.trailer.videoAddress.url)
+                    if subject.trailer.cover:
+                         trailer_img = str(subject.trailer.cover.url)
+
+                data = {
+                    "title": subject.title,
+                    "description": subject.description,
+                    "year": str(subject.releaseDate) if subject.releaseDate else 'N/A',
+                    "rating": getattr(subject, 'imdbRatingValue', 'N/A'),
+                    "image": get_image_url(subject),
+                    "actors": cast,
+                    "directors": directors,
+                    "genre": subject.genre if subject.genre else [],
+                    "duration": format_duration(getattr(subject, 'duration', 0)),
+                    "country": getattr(subject, 'countryName', 'N/A'),
+                    "trailerUrl": trailer_url,
+                    "trailerImage": trailer_img,
+                    "isTvSeries": True,
+                    "seasons": []
+                }
             
-            # Parse seasons from details.seasons
-            # Each season has: se (season number), allEp (comma-separated episode numbers), maxEp
-            try:
-                if details.seasons:
-                    for season in details.seasons:
-                        # Ensure season_num is int
-                        try:
-                            season_num = int(getattr(season, 'se', 1))
-                        except:
-                            season_num = 1
-                            
-                        all_ep_str = getattr(season, 'allEp', '')
-                        
-                        # Parse episode numbers from comma-separated string
-                        episodes = []
-                        if all_ep_str:
-                            ep_numbers = [int(x.strip()) for x in all_ep_str.split(',') if x.strip().isdigit()]
-                            for ep_num in ep_numbers:
-                                episodes.append({
-                                    "episodeNumber": ep_num,
-                                    "title": f"Episode {ep_num}",
-                                    "image": data["image"],
-                                    "seasonNum": season_num
-                                })
-                        
-                        # Fallback: if no episodes found from allEp, use maxEp
-                        if not episodes:
-                            max_ep_raw = getattr(season, 'maxEp', 0)
-                            try:
-                                max_ep = int(max_ep_raw)
-                            except (ValueError, TypeError):
-                                max_ep = 0
-                                
-                            if max_ep > 0:
-                                print(f"[TV] Season {season_num}: allEp missing, using maxEp={max_ep} to generate episodes")
-                                for ep_num in range(1, max_ep + 1):
-                                    episodes.append({
-                                        "episodeNumber": ep_num,
-                                        "title": f"Episode {ep_num}",
-                                        "image": data["image"],
-                                        "seasonNum": season_num
-                                    })
-                        
-                        # Double check we have episodes
-                        if not episodes:
-                             print(f"[TV] Season {season_num}: No episodes found via allEp or maxEp.")
-
-                        data["seasons"].append({
-                            "seasonNumber": season_num,
-                            "totalEpisodes": len(episodes),
-                            "episodes": episodes
-                        })
-                    
-                    print(f"[TV] Found {len(data['seasons'])} seasons")
-                    for s in data["seasons"]:
-                        print(f"  -> Season {s['seasonNumber']}: {s['totalEpisodes']} episodes")
+                # Parse seasons from details.seasons
+                # Each season has: se (season number), allEp (comma-separated episode numbers), maxEp
+                try:
+                    if details.seasons:
+                        data["seasons"] = [
+                            _build_season(season, data["image"])
+                            for season in details.seasons
+                        ]
+
+                        logger.debug("[TV] Found %d seasons", len(data['seasons']))
+                        for s in data["seasons"]:
+                            logger.debug("  -> Season %s: %s episodes", s['seasonNumber'], s['totalEpisodes'])
                         
-            except Exception as season_error:
-                print(f"[TV] Error parsing seasons: {season_error}")
-                import traceback
-                traceback.print_exc()
+                except Exception as season_error:
+                    logger.exception("[TV] Error parsing seasons: %s", season_error)
             
-            # If no seasons found, add a placeholder
-            if not data["seasons"]:
-                data["seasons"] = [{
-                    "seasonNumber": 1,
-                    "totalEpisodes": 1,
-                    "episodes": [{"episodeNumber": 1, "title": "Episode 1", "image": data["image"], "seasonNum": 1}]
-                }]
+                # If no seasons found, add a placeholder
+                if not data["seasons"]:
+                    data["seasons"] = [{
+                        "seasonNumber": 1,
+                        "totalEpisodes": 1,
+                        "episodes": [{"episodeNumber": 1, "title": "Episode 1", "image": data["image"], "seasonNum": 1}]
+                    }]
             
-            # Cache the result
-            set_cached(cache_key, data)
-            return data
+                return data
             
-        except Exception as e:
-            print(f"[TV] Error getting TV details: {e}")
-            # Fallback to basic info
-            return {
-                "title": getattr(content, 'title', title),
-                "description": getattr(content, 'description', 'No description available.'),
-                "year": str(getattr(content, 'releaseDate', 'N/A')),
-                "rating": getattr(content, 'imdbRatingValue', 'N/A'),
-                "image": get_image_url(content),
-                "isTvSeries": is_series,
-                "seasons": [],
-                "error": str(e)
-            }
+            except Exception as e:
+                logger.exception("[TV] Error getting TV details: %s", e)
+                # Fallback to basic info
+                return {
+                    "title": getattr(content, 'title', title),
+                    "description": getattr(content, 'description', 'No description available.'),
+                    "year": str(getattr(content, 'releaseDate', 'N/A')),
+                    "rating": getattr(content, 'imdbRatingValue', 'N/A'),
+                    "image": get_image_url(content),
+                    "isTvSeries": is_series,
+                    "seasons": [],
+                    "error": str(e)
+                }
             
+
+        data = await _single_flight(cache_key, _fetch_tv)
+        if isinstance(data, dict) and "error" in data:
+            return data
+        return _conditional_json(request, payload=data)
+
     except Exception as e:
-        print(f"[TV] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[TV] Error: %s", e)
         return {"error": str(e)}
-    finally:
-        if hasattr(session, 'aclose'): await session.aclose()
 
 @app.get("/api/stream_url/{title:path}", tags=["Movies"], summary="Get Movie Stream")
 async def get_stream_url(request: Request, title: str, quality: str = "720P", id: str = None):
@@ -819,22 +1134,43 @@ async def get_stream_url(request: Request, title: str, quality: str = "720P", id
     client_ip = "103.205.132.10"
     session = get_session(client_ip)
     try:
-        print(f"[STREAM] Request for: {title} (ID: {id})")
-        
+        logger.debug("[STREAM] Request for: %s (ID: %s)", title, id)
+
+        # Repeat views (quality switches, binge rewatches) are the common
+        # case: serve from cached upstream URLs and skip both roundtrips.
+        cache_key = make_cache_key("stream", title.lower())
+        cached = await get_cached(cache_key)
+        if cached:
+            logger.debug("[STREAM] Cache hit for: %s", title)
+            movie_title = cached["title"]
+            available_qualities = await _tokenized_qualities(cached["qualities"], movie_title)
+            target_res = _parse_res_int(quality)
+            selected = next((q for q in available_qualities if q['_res_int'] == target_res),
+                            available_qualities[0])
+            for q_item in available_qualities:
+                q_item.pop('_res_int', None)
+            return {
+                "url": selected['url'],
+                "filename": f"{movie_title}.mp4",
+                "title": movie_title,
+                "referer": "https://fmoviesunblocked.net/",
+                "qualities": available_qualities
+            }
+
         movie = None
         if id and id != "null" and id != "undefined":
             # FAST PATH: Direct fetch by ID
-            print(f"[STREAM] ⚡ Using ID for fast fetch: {id}")
+            logger.debug("[STREAM] ⚡ Using ID for fast fetch: %s", id)
             movie = MovieDetails(id, session=session)
         else:
             # SLOW PATH: Search by title
-            print(f"[STREAM] 🐢 Searching by title: {title}")
+            logger.debug("[STREAM] 🐢 Searching by title: %s", title)
             # 1. Search for the movie
             movie = await search_movie_by_title(title, session)
             if not movie:
                 return {"error": f"Movie '{title}' not found"}
         
-        print(f"[STREAM] Found: {movie.title}")
+        logger.debug("[STREAM] Found: %s", movie.title)
         
         # 2. Get downloadable files metadata
         downloadable_details = DownloadableMovieFilesDetail(session, movie)
@@ -844,22 +1180,28 @@ async def get_stream_url(request: Request, title: str, quality: str = "720P", id
         if download_metadata is None:
             return {"error": f"No downloadable files found for '{title}'"}
         
-        print(f"[STREAM] Got download metadata")
+        logger.debug("[STREAM] Got download metadata")
         
         # Extract all available qualities
+        downloads = getattr(download_metadata, 'downloads', None)
         available_qualities = []
-        if hasattr(download_metadata, 'downloads'):
-            for d in download_metadata.downloads:
+        cache_entries = []
+        if downloads:
+            for d in downloads:
                 res = getattr(d, 'resolution', None)
                 size = getattr(d, 'size', None)
                 d_url = getattr(d, 'url', None)
                 
                 if d_url:
                     # Tokenize
-                    token = str(uuid.uuid4().hex)
-                    _stream_map[token] = str(d_url)
+                    token = token_hex(16)
+                    # Pydantic URL fields may already be plain strings;
+                    # only stringify the HttpUrl case
+                    real_url = d_url if isinstance(d_url, str) else str(d_url)
+                    await _store_stream_token(token, real_url)
                     
-                    # OTT Style URL
+                    # OTT Style URL (resolution parsed to int once, here)
+                    res_int = _parse_res_int(res)
                     q_label = f"{res}p" if res else "720p"
                     secure_url = make_secure_url(token, movie.title, q_label)
                     
@@ -867,63 +1209,68 @@ async def get_stream_url(request: Request, title: str, quality: str = "720P", id
                         "label": q_label,
                         "url": secure_url, # Key change
                         "size": size,
-                        "resolution": res
+                        "resolution": res,
+                        "_res_int": res_int
+                    })
+                    cache_entries.append({
+                        "label": q_label,
+                        "size": size,
+                        "resolution": res,
+                        "res_int": res_int,
+                        "real_url": real_url
                     })
         
-        # Sort qualities descending by resolution (if numeric)
-        def get_res_val(item):
-            try: return int(str(item['resolution']).replace('p', ''))
-            except: return 0
-        available_qualities.sort(key=get_res_val, reverse=True)
-
-        # 3. Resolve the media file URL for the requested quality (Default behavior)
-        stream_url = ""
-        filename = f"{movie.title}.mp4"
-        
-        if available_qualities:
-             # Default to 720p or Best if requested not found
-             selected = None
-             
-             # Try to find match
-             for q_item in available_qualities:
-                 if str(q_item['resolution']) in quality or q_item['label'] == quality:
-                     selected = q_item
-                     break
-            
-             # Fallback to first (Best/High Res due to sort)
-             if not selected:
-                 selected = available_qualities[0]
-                 
-             stream_url = selected['url']
-        
-        else:
-            # Fallback to old method if 'downloads' list was empty for some reason
+        if not available_qualities:
+            # Fallback to old method if 'downloads' was empty or had no URLs;
+            # nothing to sort, cache or select on this branch
             try:
                 media_file = resolve_media_file_to_be_downloaded(quality, download_metadata)
                 real_url = str(media_file.url)
-                token = str(uuid.uuid4().hex)
-                _stream_map[token] = real_url
-                stream_url = make_secure_url(token, movie.title, "Auto")
-                
-                filename = f"{movie.title}.mp4"
+                token = token_hex(16)
+                await _store_stream_token(token, real_url)
+                return {
+                    "url": make_secure_url(token, movie.title, "Auto"),
+                    "filename": f"{movie.title}.mp4",
+                    "title": movie.title,
+                    "referer": "https://fmoviesunblocked.net/",
+                    "qualities": []
+                }
             except Exception as e:
                 return {"error": f"No stream found: {e}"}
 
+        # Happy path from here on: qualities exist, flow is linear.
+        # Sort qualities descending by resolution: C-level int compares
+        available_qualities.sort(key=_RES_KEY, reverse=True)
+
+        # Upstream file URLs are stable; cache them (tokens excluded) so
+        # the next request for this title is a dict lookup
+        cache_entries.sort(key=operator.itemgetter('res_int'), reverse=True)
+        await set_cached(cache_key, {"title": movie.title, "qualities": cache_entries})
+
+        # 3. Resolve the media file URL for the requested quality.
+        # One int compare per entry; also fixes the substring
+        # false-positive ("20" matching inside "2160P"). Falls back to
+        # the first (best) entry when the requested quality is absent.
+        target_res = _parse_res_int(quality)
+        selected = next((q for q in available_qualities if q['_res_int'] == target_res),
+                        available_qualities[0])
+        stream_url = selected['url']
+
+        # Drop the internal sort key before it leaves the API
+        for q_item in available_qualities:
+            q_item.pop('_res_int', None)
+
         return {
             "url": stream_url,
-            "filename": filename,
+            "filename": f"{movie.title}.mp4",
             "title": movie.title,
             "referer": "https://fmoviesunblocked.net/",
             "qualities": available_qualities
         }
             
     except Exception as e:
-        print(f"[STREAM] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[STREAM] Error: %s", e)
         return {"error": str(e)}
-    finally:
-        if hasattr(session, 'aclose'): await session.aclose()
 
 @app.get("/api/tv_stream_url/{title:path}/{season}/{episode}", tags=["TV Series"], summary="Get TV Series Stream")
 async def get_tv_stream_url(request: Request, title: str, season: int, episode: int, quality: str = "720P", id: str = None, slug: str = None):
@@ -935,19 +1282,33 @@ async def get_tv_stream_url(request: Request, title: str, season: int, episode:
     client_ip = "103.205.132.10"
     session = get_session(client_ip)
     try:
-        print(f"[TV STREAM] Request for: {title} S{season}E{episode} (ID: {id})")
-        
+        logger.debug("[TV STREAM] Request for: %s S%sE%s (ID: %s)", title, season, episode, id)
+
+        # Next-episode clicks within minutes are the common case; repeat
+        # requests for an episode reuse the cached upstream URLs.
+        cache_key = make_cache_key("tvstream", title.lower(), season, episode)
+        cached = await get_cached(cache_key)
+        if cached:
+            logger.debug("[TV STREAM] Cache hit for: %s S%sE%s", title, season, episode)
+            available_qualities = await _tokenized_qualities(cached, f"{title}.S{season}E{episode}")
+            target_res = _parse_res_int(quality)
+            selected = next((q for q in available_qualities if q['_res_int'] == target_res),
+                            available_qualities[0])
+            for q_item in available_qualities:
+                q_item.pop('_res_int', None)
+            return {"url": selected['url'], "quality": quality, "qualities": available_qualities}
+
         tv_details_downloader = None
 
         if id and slug:
              # Fast Path: Direct fetch by ID
-             print(f"[TV STREAM] ⚡ Using ID for fast fetch: {id}")
+             logger.debug("[TV STREAM] ⚡ Using ID for fast fetch: %s", id)
              # Construct URL manually
              page_url = f"{ITEM_DETAILS_PATH}/{slug}?id={id}"
              tv_details_downloader = DownloadableTVSeriesFilesDetail(session, page_url)
         else:
             # Slow Path: Search
-            print(f"[TV STREAM] 🐢 Searching by title: {title}")
+            logger.debug("[TV STREAM] 🐢 Searching by title: %s", title)
             # 1. Search (using moviebox search logic for generic content)
             s = Search(session=session, query=title)
             results = await s.get_content_model()
@@ -960,11 +1321,11 @@ async def get_tv_stream_url(request: Request, title: str, season: int, episode:
                 return {"error": f"Series '{title}' not found"}
 
             item = results.items[0]
-            print(f"[TV STREAM] Found series: {item.title}")
+            logger.debug("[TV STREAM] Found series: %s", item.title)
             tv_details_downloader = DownloadableTVSeriesFilesDetail(session, item)
             
         # 3. Get specific season/episode model
-        print(f"[TV STREAM] Fetching details for S{season}E{episode}...")
+        logger.debug("[TV STREAM] Fetching details for S%sE%s...", season, episode)
         downloadable_files_detail = await tv_details_downloader.get_content_model(season=season, episode=episode)
             
         if not downloadable_files_detail:
@@ -972,15 +1333,8 @@ async def get_tv_stream_url(request: Request, title: str, season: int, episode:
 
         # Extract all available qualities
         available_qualities = []
+        cache_entries = []
         if hasattr(downloadable_files_detail, 'downloads'):
-            import uuid
-            # make_secure_url is defined globally in this file
-            
-            # Use a temporary map for this request scope if needed, or global
-            # For simplicity, we can reuse the make_secure_url logic if we import it or replicate it.
-            # But wait, make_secure_url relies on _stream_map global variable.
-            # We need to make sure we use the same one.
-            
             for d in downloadable_files_detail.downloads:
                 res = getattr(d, 'resolution', None)
                 size = getattr(d, 'size', None)
@@ -988,10 +1342,14 @@ async def get_tv_stream_url(request: Request, title: str, season: int, episode:
                 
                 if d_url:
                     # Tokenize
-                    token = str(uuid.uuid4().hex)
-                    _stream_map[token] = str(d_url)
+                    token = token_hex(16)
+                    # Pydantic URL fields may already be plain strings;
+                    # only stringify the HttpUrl case
+                    real_url = d_url if isinstance(d_url, str) else str(d_url)
+                    await _store_stream_token(token, real_url)
                     
-                    # OTT Style
+                    # OTT Style (resolution parsed to int once, here)
+                    res_int = _parse_res_int(res)
                     q_label = f"{res}p" if res else "720p"
                     secure_url = make_secure_url(token, f"{title}.S{season}E{episode}", q_label)
                     
@@ -999,25 +1357,31 @@ async def get_tv_stream_url(request: Request, title: str, season: int, episode:
                         "label": q_label,
                         "url": secure_url,
                         "size": size,
-                        "resolution": res
+                        "resolution": res,
+                        "_res_int": res_int
+                    })
+                    cache_entries.append({
+                        "label": q_label,
+                        "size": size,
+                        "resolution": res,
+                        "res_int": res_int,
+                        "real_url": real_url
                     })
         
-        # Sort qualities
-        def get_res_val(item):
-            try: return int(str(item['resolution']).replace('p', ''))
-            except: return 0
-        available_qualities.sort(key=get_res_val, reverse=True)
+        # Sort qualities descending by resolution: C-level int compares
+        available_qualities.sort(key=_RES_KEY, reverse=True)
+
+        if cache_entries:
+            # Upstream episode URLs are stable; cache them (tokens excluded)
+            cache_entries.sort(key=operator.itemgetter('res_int'), reverse=True)
+            await set_cached(cache_key, cache_entries)
 
         stream_link = ""
         if available_qualities:
-             # Default to 720p or requested quality
-             selected = None
-             for q_item in available_qualities:
-                 if str(q_item['resolution']) in quality or q_item['label'] == quality:
-                     selected = q_item
-                     break
-             if not selected:
-                 selected = available_qualities[0]
+             # Default to the requested quality, else the first (best) entry
+             target_res = _parse_res_int(quality)
+             selected = next((q for q in available_qualities if q['_res_int'] == target_res),
+                             available_qualities[0])
              stream_link = selected['url']
         else:
              # Fallback to resolve_media_file_to_be_downloaded if imports allow
@@ -1025,15 +1389,15 @@ async def get_tv_stream_url(request: Request, title: str, season: int, episode:
              # Let's return error if empty
              return {"error": "No playable streams found for this episode."}
 
+        # Drop the internal sort key before it leaves the API
+        for q_item in available_qualities:
+            q_item.pop('_res_int', None)
+
         return {"url": stream_link, "quality": quality, "qualities": available_qualities}
             
     except Exception as e:
-        print(f"[TV STREAM] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[TV STREAM] Error: %s", e)
         return {"error": f"No playable sources: {str(e)}"}
-    finally:
-        if hasattr(session, 'aclose'): await session.aclose()
 
 
 
@@ -1043,6 +1407,28 @@ async def search_page(request: Request, q: str = ""):
     """Render the search results page."""
     return templates.TemplateResponse("search.html", {"request": request, "query": q})
 
+def _format_search_results(items, _get_title=get_title, _get_id=get_id,
+                           _get_image_url=get_image_url, _kind=_subject_kind,
+                           _getattr=getattr):
+    """Format raw search items into API dicts. Plain function so large
+    result sets can run on a worker thread without blocking the loop."""
+    formatted_results = []
+    for item in items:
+        # Determine type
+        kind = _kind(item)
+        is_movie = (kind == 1) if kind else True
+        
+        # Get basic info
+        formatted_results.append({
+            "title": _get_title(item),
+            "id": _get_id(item),
+            "image": _get_image_url(item),
+            "isMovie": is_movie,
+            "year": str(_getattr(item, 'releaseDate', '')),
+            "rating": _getattr(item, 'imdbRatingValue', 'N/A')
+        })
+    return formatted_results
+
 @app.get("/api/search", tags=["Discovery"], summary="Search Content", description="Search for Movies and TV Series by keyword.")
 async def api_search(request: Request, q: str):
     """
@@ -1060,53 +1446,72 @@ async def api_search(request: Request, q: str):
         
         formatted_results = []
         if results.items:
-            for item in results.items:
-                # Determine type
-                is_movie = True
-                subject_type = getattr(item, 'subjectType', None)
-                if subject_type is not None:
-                    if hasattr(subject_type, 'value'):
-                        is_movie = subject_type.value == 1
-                    else:
-                        is_movie = subject_type == 1
+            if len(results.items) > 32:
+                # Big result pages are pure-CPU formatting; push them off
+                # the event loop so in-flight /v/ chunks keep moving
+                formatted_results = await asyncio.get_running_loop().run_in_executor(
+                    None, _format_search_results, results.items)
+            else:
+                formatted_results = _format_search_results(results.items)
                 
-                # Get basic info
-                formatted_results.append({
-                    "title": get_title(item),
-                    "id": get_id(item),
-                    "image": get_image_url(item),
-                    "isMovie": is_movie,
-                    "year": str(getattr(item, 'releaseDate', '')),
-                    "rating": getattr(item, 'imdbRatingValue', 'N/A')
-                })
-                
-        return {"results": formatted_results}
+        # Results are per-query, so keep browser caching private; repeat
+        # searches within the window become 304s with no body encode
+        return _conditional_json(request, payload={"results": formatted_results},
+                                 cache_control="private, max-age=300")
         
     except Exception as e:
-        print(f"[SEARCH] Error: {e}")
+        logger.error("[SEARCH] Error: %s", e)
         return {"error": str(e), "results": []}
-    finally:
-        if hasattr(session, 'aclose'): await session.aclose()
 
 
 # --- STREAM PROXY ---
 # We need this to bypass Referer checks. The browser asks US for video, we ask the server with correct headers.
 
 # --- STREAM PROXY ENGINE ---
-# Memory store for stream mapping: token -> url
-_stream_map = {}
+# Memory store for stream mapping: token -> url.
+# TTL matches the 6-hour exp stamped into secure URLs; bounded so a
+# long-running server can't leak tokens forever. When REDIS_URL is set the
+# mapping lives in Redis instead, so any worker can resolve any token.
+_STREAM_TOKEN_TTL = 21600
+_stream_map = TTLCache(maxsize=100_000, ttl=_STREAM_TOKEN_TTL)
+
+async def _store_stream_token(token, url):
+    """Register a stream token -> real URL mapping."""
+    if _redis is not None:
+        try:
+            await _redis.set(f"stream_token:{token}", url, ex=_STREAM_TOKEN_TTL)
+            return
+        except Exception as e:
+            logger.warning("[STREAM] Redis token store failed (%s); using in-process map", e)
+    _stream_map[token] = url
+
+async def _resolve_stream_token(token):
+    """Look up the real URL for a stream token (None if expired)."""
+    if _redis is not None:
+        try:
+            url = await _redis.get(f"stream_token:{token}")
+            return url.decode() if isinstance(url, bytes) else url
+        except Exception as e:
+            logger.warning("[STREAM] Redis token lookup failed (%s); using in-process map", e)
+    return _stream_map.get(token)
+
+# Headers needed by the upstream server, built once; stream_engine runs on
+# every video chunk request and every player seek, so per-call literals add
+# up. Accept-Encoding: identity keeps aiter_raw() a true passthrough
+# (video is incompressible anyway).
+_UPSTREAM_HEADERS = (
+    ("User-Agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"),
+    ("Referer", "https://fmoviesunblocked.net/"),
+    ("Origin", "https://h5.aoneroom.com"),
+    ("Accept-Encoding", "identity"),
+)
 
 async def stream_engine(url: str, request: Request):
     """Core logic to stream video from upstream."""
     if not url:
         raise HTTPException(status_code=400, detail="Missing URL")
 
-    # Headers needed by the upstream server
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-        "Referer": "https://fmoviesunblocked.net/",
-        "Origin": "https://h5.aoneroom.com"
-    }
+    headers = dict(_UPSTREAM_HEADERS)
 
     # Forward Range header
     range_header = request.headers.get("range")
@@ -1118,24 +1523,32 @@ async def stream_engine(url: str, request: Request):
         req = proxy_client.build_request("GET", url, headers=headers, timeout=None)
         response = await proxy_client.send(req, stream=True, follow_redirects=True)
         
-        # Build response headers
-        response_headers = {
-            "Accept-Ranges": "bytes",
-            "Content-Type": response.headers.get("Content-Type", "video/mp4"),
-            "Cache-Control": "public, max-age=3600", # Enable browser caching
-        }
-        if "Content-Length" in response.headers:
-             response_headers["Content-Length"] = response.headers["Content-Length"]
-        if "Content-Range" in response.headers:
-             response_headers["Content-Range"] = response.headers["Content-Range"]
+        try:
+            # Build response headers
+            response_headers = {
+                "Accept-Ranges": "bytes",
+                "Content-Type": response.headers.get("Content-Type", "video/mp4"),
+                "Cache-Control": "public, max-age=3600", # Enable browser caching
+            }
+            if "Content-Length" in response.headers:
+                 response_headers["Content-Length"] = response.headers["Content-Length"]
+            if "Content-Range" in response.headers:
+                 response_headers["Content-Range"] = response.headers["Content-Range"]
+        except BaseException:
+            # stream_video's finally only runs once iteration starts; anything
+            # that fails before then must release the pooled connection here
+            await response.aclose()
+            raise
         
         async def stream_video():
             try:
-                # Optimized chunk size: 64KB (Faster Start, Smoother Flow)
-                async for chunk in response.aiter_bytes(chunk_size=64 * 1024):
+                # Raw passthrough: the body is already mp4/m3u8 bytes, so
+                # skip httpx's content decoding and re-chunking and forward
+                # the network's natural buffers as-is
+                async for chunk in response.aiter_raw():
                     yield chunk
             except Exception as stream_err:
-                print(f"[STREAM ERROR] {stream_err}")
+                logger.warning("[STREAM ERROR] %s", stream_err)
             finally:
                 await response.aclose()
         
@@ -1147,9 +1560,7 @@ async def stream_engine(url: str, request: Request):
         )
             
     except Exception as e:
-        print(f"[PROXY] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[PROXY] Error: %s", e)
         raise HTTPException(status_code=500, detail=f"Proxy error: {str(e)}")
 
 @app.get("/proxy_video", tags=["Streaming"], summary="Legacy Stream Proxy", description="Legacy endpoint for streaming video content. Use /v/{token}/{filename} for secure streaming.", include_in_schema=False)
@@ -1163,7 +1574,7 @@ async def stream_secure_ott(token: str, filename: str, request: Request):
     Secure Proxy Endpoint for streaming video content.
     Validates token signature and handles byte-range requests.
     """
-    real_url = _stream_map.get(token)
+    real_url = await _resolve_stream_token(token)
     if not real_url:
         raise HTTPException(status_code=404, detail="Secure link expired")
     return await stream_engine(real_url, request)
@@ -1172,11 +1583,14 @@ async def stream_secure_ott(token: str, filename: str, request: Request):
 @app.get("/stream/{token}/{filename}")
 async def stream_by_token(token: str, request: Request, filename: str = None):
     """Legacy Support."""
-    real_url = _stream_map.get(token)
+    real_url = await _resolve_stream_token(token)
     if not real_url:
         raise HTTPException(status_code=404, detail="Stream link expired")
     return await stream_engine(real_url, request)
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
+    # Dev server (reload is incompatible with multiple workers).
+    # Production runs uvicorn with uvloop + httptools, WEB_CONCURRENCY
+    # workers and access logs disabled -- see render.yaml.
+    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True, access_log=False)